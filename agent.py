@@ -1,39 +1,17 @@
 # agent.py - Fixed Main Agent Implementation
-from langchain_groq import ChatGroq
-from langchain.agents import create_react_agent, AgentExecutor
-from langchain.prompts import PromptTemplate
 from tools import (LocationTool, WeatherTool, AQITool, DayTypeTool, 
                   BestTimeSelectorTool, MotivationTool, TelegramTool)
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
 import os
-import json
 from datetime import datetime
 import logging
 from dotenv import load_dotenv
 
 load_dotenv()
 
-
-class OutdoorSportsPlannerAgent:
-    def __init__(self):
-        try:
-            self.llm = ChatGroq(
-                temperature=0.7,
-                groq_api_key=os.getenv("GROQ_API_KEY"),
-                model_name="llama3-70b-8192"
-            )
-            
-            self.tools = [
-                LocationTool(),
-                WeatherTool(), 
-                AQITool(),
-                DayTypeTool(),
-                BestTimeSelectorTool(),
-                MotivationTool(),
-                TelegramTool()
-            ]
-            
-            # Create react agent prompt
-            template = """You are an outdoor sports planning agent. You have access to the following tools:
+# ReAct agent prompt
+REACT_PROMPT_TEMPLATE = """You are an outdoor sports planning agent. You have access to the following tools:
 
 {tools}
 
@@ -53,19 +31,20 @@ Begin!
 Question: {input}
 Thought: {agent_scratchpad}"""
 
-            prompt = PromptTemplate.from_template(template)
-            
-            # Create the agent
-            agent = create_react_agent(self.llm, self.tools, prompt)
-            
-            # Create agent executor
-            self.agent_executor = AgentExecutor(
-                agent=agent, 
-                tools=self.tools, 
-                verbose=True,
-                handle_parsing_errors=True,
-                max_iterations=10
-            )
+
+class OutdoorSportsPlannerAgent:
+    def __init__(self):
+        try:
+            self.tools = [
+                LocationTool(),
+                WeatherTool(), 
+                AQITool(),
+                DayTypeTool(),
+                BestTimeSelectorTool(),
+                MotivationTool(),
+                TelegramTool()
+            ]
+            self.tool_map = {tool.name: tool for tool in self.tools}
             
             self.default_sport = "cricket"
             self.user_id = "user123"
@@ -77,6 +56,43 @@ Thought: {agent_scratchpad}"""
             logging.error(f"Error initializing agent: {e}")
             raise
     
+    @cached_property
+    def llm(self):
+        """Groq chat model, only created when the LLM path is used"""
+        from langchain_groq import ChatGroq
+        
+        return ChatGroq(
+            temperature=0.7,
+            groq_api_key=os.getenv("GROQ_API_KEY"),
+            model_name="llama3-70b-8192"
+        )
+    
+    @cached_property
+    def agent_executor(self):
+        """ReAct agent executor, built on first use since the scheduled job never needs it"""
+        from langchain.agents import create_react_agent, AgentExecutor
+        from langchain.prompts import PromptTemplate
+        
+        prompt = PromptTemplate.from_template(REACT_PROMPT_TEMPLATE)
+        
+        # Create the agent
+        agent = create_react_agent(self.llm, self.tools, prompt)
+        
+        # Create agent executor
+        return AgentExecutor(
+            agent=agent, 
+            tools=self.tools, 
+            verbose=True,
+            handle_parsing_errors=True,
+            max_iterations=10
+        )
+    
+    def _run_parallel(self, tasks):
+        """Run independent tool calls concurrently and return results by key"""
+        with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+            futures = {key: executor.submit(task) for key, task in tasks.items()}
+            return {key: future.result() for key, future in futures.items()}
+    
     def generate_sports_recommendation_direct(self, sport=None):
         """Direct method without LLM for reliability"""
         if sport is None:
@@ -85,51 +101,35 @@ Thought: {agent_scratchpad}"""
         try:
             logging.info(f"Generating recommendation for sport: {sport}")
             
+            tools = self.tool_map
+            
             # Step 1: Get location
-            location_tool = LocationTool()
-            location_result = location_tool._run(self.user_id)
-            location_data = json.loads(location_result)
+            location_data = tools['get_location']._run_native(self.user_id)
             city = location_data["city"]
             logging.info(f"Location: {city}")
             
-            # Step 2: Get weather
-            weather_tool = WeatherTool()
-            weather_result = weather_tool._run(city)
-            logging.info(f"Weather data retrieved: {len(json.loads(weather_result))} entries")
-            
-            # Step 3: Get AQI
-            aqi_tool = AQITool()
-            aqi_result = aqi_tool._run(city)
-            logging.info(f"AQI data retrieved: {len(json.loads(aqi_result))} entries")
-            
-            # Step 4: Check day type
-            day_tool = DayTypeTool()
-            day_result = day_tool._run(datetime.now().isoformat())
-            logging.info(f"Day type: {day_result}")
-            
-            # Step 5: Find best times - Fix the parameter passing
-            selector_tool = BestTimeSelectorTool()
-            
-            # Create the combined data structure that the tool expects
-            combined_data = {
-                'sport': sport,
-                'weather_data': weather_result,  # This is already a JSON string
-                'aqi_data': aqi_result,          # This is already a JSON string
-                'day_type': day_result           # This is already a JSON string
-            }
-            
-            # Convert to JSON string as expected by the tool
-            combined_data_json = json.dumps(combined_data)
-            best_times_result = selector_tool._run(combined_data_json)
-            best_times = json.loads(best_times_result)
+            # Steps 2-4: Weather, AQI and day type are independent, fetch them concurrently
+            results = self._run_parallel({
+                'weather': lambda: tools['get_hourly_weather']._run_native(city),
+                'aqi': lambda: tools['get_hourly_aqi']._run_native(city),
+                'day_type': lambda: tools['is_holiday_or_weekend']._run_native(datetime.now().isoformat())
+            })
+            weather_data = results['weather']
+            aqi_data = results['aqi']
+            day_data = results['day_type']
+            logging.info(f"Weather data retrieved: {len(weather_data)} entries")
+            logging.info(f"AQI data retrieved: {len(aqi_data)} entries")
+            logging.info(f"Day type: {day_data}")
+            
+            # Step 5: Find best times - pass native data straight to the selector
+            selection = tools['choose_best_time']._run_native(sport, weather_data, aqi_data, day_data)
+            best_times = selection['slots']
             logging.info(f"Best times found: {len(best_times)} slots")
             
             # Step 6: Get motivation if weekend
-            day_data = json.loads(day_result)
             motivation = ""
             if day_data["type"] != "weekday":
-                motivation_tool = MotivationTool()
-                motivation = motivation_tool._run(day_result)
+                motivation = tools['get_motivation']._run_native(day_data)
                 logging.info(f"Motivation message: {motivation}")
             
             # Step 7: Format message
@@ -137,29 +137,26 @@ Thought: {agent_scratchpad}"""
                 message = f"⚠️ Weather/AQI not suitable for playing {sport} today in {city}. Consider indoor alternatives."
                 logging.info("No suitable time slots found")
             else:
-                weather_data = json.loads(weather_result)
-                aqi_data = json.loads(aqi_result)
-                
-                message = f"🏏 Best time for {sport} today in {city}:\n"
+                parts = [f"🏏 Best time for {sport} today in {city}:\n"]
                 for slot in best_times[:2]:
-                    start_time = datetime.fromisoformat(slot['start'].replace(' ', 'T')).strftime("%H:%M")
-                    end_time = datetime.fromisoformat(slot['end']).strftime("%H:%M")
-                    message += f"- {start_time}-{end_time} (score: {slot['score']})\n"
+                    # Slot times are fixed-width "YYYY-MM-DD HH:MM:SS", so HH:MM is a slice
+                    start_time = slot['start'][11:16]
+                    end_time = slot['end'][11:16]
+                    parts.append(f"- {start_time}-{end_time} (score: {slot['score']})\n")
                 
-                avg_temp = sum(w['temp'] for w in weather_data) / len(weather_data)
-                avg_aqi = sum(a['aqi'] for a in aqi_data) / len(aqi_data)
-                message += f"Conditions: {avg_temp:.1f}°C, AQI {avg_aqi:.0f}"
+                # Averages come precomputed from the selector
+                parts.append(f"Conditions: {selection['avg_temp']:.1f}°C, AQI {selection['avg_aqi']:.0f}")
                 
                 if motivation:
-                    message += f"\n\n🎉 {motivation}"
+                    parts.append(f"\n\n🎉 {motivation}")
                 
+                message = "".join(parts)
                 logging.info(f"Generated message: {message[:100]}...")
             
             # Step 8: Send message
             if self.chat_id:
                 try:
-                    telegram_tool = TelegramTool()
-                    telegram_result = telegram_tool._run(self.chat_id, message)
+                    telegram_result = tools['send_message']._run(self.chat_id, message)
                     logging.info(f"Telegram message sent: {telegram_result}")
                 except Exception as e:
                     logging.error(f"Failed to send Telegram message: {e}")
@@ -172,10 +169,14 @@ Thought: {agent_scratchpad}"""
             error_msg = f"Error generating recommendation: {str(e)}"
             logging.error(error_msg)
             logging.error(f"Error type: {type(e).__name__}")
-            import traceback
-            logging.error(f"Traceback: {traceback.format_exc()}")
+            logging.debug("Traceback:", exc_info=True)
             return error_msg
     
+    def run_with_llm(self, query):
+        """Answer a free-form planning question through the LangChain ReAct agent"""
+        result = self.agent_executor.invoke({"input": query})
+        return result["output"]
+    
     def run_daily_recommendation(self):
         """Run daily recommendation for default sport"""
         return self.generate_sports_recommendation_direct()
@@ -1,11 +1,20 @@
 # docker-main.py - Fixed version with proper logging setup
-import schedule
-import time
-from threading import Thread
+import signal
+from datetime import datetime, timedelta
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from threading import Event, Thread
 from agent import OutdoorSportsPlannerAgent
 import os
 import logging
 
+DAILY_NOTIFICATION_HOUR = 6
+# Must match the EXPOSE and healthcheck port in the Dockerfile and docker-compose.yaml
+HEALTH_PORT = 8000
+
+# Set to stop the scheduler; waiting on it means no wakeups between runs
+stop_event = Event()
+
 def setup_logging():
     """Setup logging with proper directory creation"""
     # Ensure logs directory exists
@@ -53,36 +62,89 @@ def setup_environment():
     logging.info("All environment variables loaded successfully")
     return True
 
+@lru_cache(maxsize=1)
+def get_agent():
+    """Return the shared agent instance, building it on first use"""
+    return OutdoorSportsPlannerAgent()
+
 def daily_sports_notification():
     """Run daily sports notification"""
     try:
         logging.info("Running daily sports notification...")
-        agent = OutdoorSportsPlannerAgent()
+        agent = get_agent()
         result = agent.run_daily_recommendation()
         logging.info(f"Daily notification completed: {result[:100]}...")
     except Exception as e:
         logging.error(f"Error in daily notification: {e}")
-        import traceback
-        logging.error(f"Traceback: {traceback.format_exc()}")
+        logging.debug("Traceback:", exc_info=True)
+
+def next_run_time(now=None):
+    """Return the next daily notification time after now"""
+    now = now or datetime.now()
+    next_run = now.replace(hour=DAILY_NOTIFICATION_HOUR, minute=0, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return next_run
 
 def run_scheduler():
-    """Run the scheduled tasks"""
-    schedule.every().day.at("06:00").do(daily_sports_notification)
-    logging.info("Scheduler started - daily notifications at 06:00")
+    """Run the scheduled tasks, sleeping until each daily run is due"""
+    logging.info(f"Scheduler started - daily notifications at {DAILY_NOTIFICATION_HOUR:02d}:00")
     
-    while True:
+    while not stop_event.is_set():
         try:
-            schedule.run_pending()
-            time.sleep(60)  # Check every minute
+            next_run = next_run_time()
+            logging.info(f"Next daily notification at {next_run}")
+            if stop_event.wait(timeout=(next_run - datetime.now()).total_seconds()):
+                break
+            if datetime.now() < next_run:
+                continue  # Woke slightly early, wait out the remainder
+            daily_sports_notification()
         except Exception as e:
             logging.error(f"Error in scheduler: {e}")
-            time.sleep(60)
+            stop_event.wait(60)
+
+class HealthHandler(BaseHTTPRequestHandler):
+    """Serves /healthz for the Docker healthcheck"""
+    
+    def do_GET(self):
+        if self.path != "/healthz":
+            self.send_error(404)
+            return
+        
+        healthy = self.server.scheduler_thread.is_alive()
+        body = b"ok" if healthy else b"scheduler not running"
+        self.send_response(200 if healthy else 503)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        # Keep periodic health probes out of the application log
+        pass
+
+def start_health_server(scheduler_thread):
+    """Start the /healthz endpoint in a daemon thread"""
+    try:
+        server = HTTPServer(("0.0.0.0", HEALTH_PORT), HealthHandler)
+        server.scheduler_thread = scheduler_thread
+        Thread(target=server.serve_forever, daemon=True).start()
+        logging.info(f"Health endpoint listening on :{HEALTH_PORT}/healthz")
+        return server
+    except Exception as e:
+        logging.warning(f"Could not start health endpoint: {e}")
+        return None
+
+def handle_shutdown(signum, frame):
+    """Signal handler that stops the scheduler and main loop"""
+    logging.info(f"Received signal {signum}, shutting down...")
+    stop_event.set()
 
 def manual_recommendation(sport="cricket"):
     """Run manual recommendation for testing"""
     try:
         logging.info(f"Running manual recommendation for {sport}...")
-        agent = OutdoorSportsPlannerAgent()
+        agent = get_agent()
         result = agent.run_custom_sport_recommendation(sport)
         logging.info(f"Manual recommendation result: {result}")
         return result
@@ -98,9 +160,16 @@ def main():
     # Check environment (but don't exit if missing - use mock data)
     env_status = setup_environment()
     
+    # Start scheduler in background thread
+    scheduler_thread = Thread(target=run_scheduler, daemon=True)
+    scheduler_thread.start()
+    
+    # Serve /healthz before the initial run so a slow first recommendation can't fail the healthcheck
+    health_server = start_health_server(scheduler_thread)
+    
     # Initialize agent
     try:
-        agent = OutdoorSportsPlannerAgent()
+        agent = get_agent()
         logging.info("OutdoorSportsPlannerAgent initialized successfully")
         
         # Test the agent immediately
@@ -110,42 +179,31 @@ def main():
         
     except Exception as e:
         logging.error(f"Failed to initialize agent: {e}")
-        import traceback
-        logging.error(f"Traceback: {traceback.format_exc()}")
+        logging.debug("Traceback:", exc_info=True)
+        stop_event.set()
+        if health_server:
+            health_server.shutdown()
         return
     
-    # Start scheduler in background thread
-    scheduler_thread = Thread(target=run_scheduler, daemon=True)
-    scheduler_thread.start()
-    
     # Docker mode - run continuously
     logging.info("🏃‍♂️ OutdoorSportsPlannerAgent is running in Docker mode!")
-    logging.info("📅 Daily notifications scheduled at 06:00")
+    logging.info(f"📅 Daily notifications scheduled at {DAILY_NOTIFICATION_HOUR:02d}:00")
     logging.info("🔧 For manual recommendations, use: docker exec <container> python -c \"from docker-main import manual_recommendation; print(manual_recommendation('cricket'))\"")
     
-    # Keep the container running with health checks
+    # Block until SIGTERM/SIGINT instead of waking up periodically
+    signal.signal(signal.SIGTERM, handle_shutdown)
+    signal.signal(signal.SIGINT, handle_shutdown)
+    
     try:
-        health_check_counter = 0
-        while True:
-            time.sleep(3600)  # Sleep for 1 hour
-            health_check_counter += 1
-            logging.info(f"Health check #{health_check_counter} - container is running")
-            
-            # Run a mini health check every 6 hours
-            if health_check_counter % 6 == 0:
-                try:
-                    logging.info("Running periodic health check...")
-                    agent = OutdoorSportsPlannerAgent()
-                    logging.info("Health check passed - agent can be initialized")
-                except Exception as e:
-                    logging.warning(f"Health check warning: {e}")
-                    
-    except KeyboardInterrupt:
+        stop_event.wait()
         logging.info("Shutting down gracefully...")
     except Exception as e:
         logging.error(f"Unexpected error in main loop: {e}")
-        import traceback
-        logging.error(f"Traceback: {traceback.format_exc()}")
+        logging.debug("Traceback:", exc_info=True)
+    finally:
+        stop_event.set()
+        if health_server:
+            health_server.shutdown()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,14 +1,103 @@
 # tools.py - Fixed LangChain Tools Implementation
 from langchain.tools import BaseTool
-from typing import Optional, Type
-from pydantic import BaseModel, Field
+from typing import Callable, Dict, Optional, Tuple, Type
+from langchain.pydantic_v1 import BaseModel, Field
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
+import numpy as np
 from datetime import datetime, timedelta
+from functools import lru_cache
 import os
 import logging
 
-class LocationInput(BaseModel):
+# Shared HTTP session so repeated API calls reuse pooled TCP/TLS connections.
+# Only connection failures are retried; read=False re-raises read timeouts as
+# requests' ReadTimeout immediately instead of retrying them into a ConnectionError.
+_http_session = requests.Session()
+_http_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4,
+                            max_retries=Retry(total=2, read=False, backoff_factor=0.3))
+_http_session.mount("https://", _http_adapter)
+_http_session.mount("http://", _http_adapter)
+
+# Forecast data only changes about hourly, so API results are reused per (city, local hour).
+# Keying on the same local hour the series are stamped with keeps weather and AQI aligned.
+_CACHE_MAXSIZE = 32
+_weather_cache = {}
+_aqi_cache = {}
+
+def _current_hour() -> datetime:
+    return datetime.now().replace(minute=0, second=0, microsecond=0)
+
+def _cache_key(city: str) -> tuple:
+    return (city, _current_hour())
+
+def _cache_store(cache: dict, key: tuple, value):
+    """Store a value, evicting entries from earlier hour buckets and the oldest if full"""
+    for stale_key in [k for k in list(cache) if k[1] != key[1]]:
+        cache.pop(stale_key, None)
+    if len(cache) >= _CACHE_MAXSIZE:
+        cache.pop(next(iter(cache)), None)
+    cache[key] = value
+
+@lru_cache(maxsize=32)
+def _parse_fixed_ts(s: str) -> Tuple[int, datetime]:
+    """Parse a forecast timestamp into (hour, datetime); slices the fixed 19-char form, else uses fromisoformat"""
+    if len(s) != 19:
+        dt = datetime.fromisoformat(s)
+        return dt.hour, dt
+    hour = int(s[11:13])
+    return hour, datetime(int(s[:4]), int(s[5:7]), int(s[8:10]), hour, int(s[14:16]), int(s[17:19]))
+
+def _score_cricket(hours: np.ndarray, temps: np.ndarray, hums: np.ndarray,
+                   rains: np.ndarray, aqis: np.ndarray) -> np.ndarray:
+    """Score every forecast slot at once using the cricket rules"""
+    return (
+        # Preferred time slots (early morning and evening)
+        3 * (((hours >= 6) & (hours <= 10)) | ((hours >= 16) & (hours <= 19)))
+        # Temperature range
+        + 2 * ((temps >= 15) & (temps <= 30))
+        # No rain
+        + 2 * ~rains
+        # Good AQI
+        + 2 * (aqis < 100)
+        # Low humidity
+        + (hums < 70)
+    )
+
+def _score_default(hours: np.ndarray, temps: np.ndarray, hums: np.ndarray,
+                   rains: np.ndarray, aqis: np.ndarray) -> np.ndarray:
+    """Sports without scoring rules never reach the minimum score"""
+    return np.zeros(len(hours), dtype=np.int64)
+
+# Scoring rules per sport (lowercase name); add an entry here to support a new sport
+SPORT_RULES: Dict[str, Callable[..., np.ndarray]] = {
+    "cricket": _score_cricket,
+}
+
+def _mock_hours(base_hour: datetime) -> list:
+    """ISO timestamps for the 8 hours starting at base_hour"""
+    hours = np.datetime64(base_hour, 'h') + np.arange(8)
+    return np.datetime_as_string(hours, unit='s').tolist()
+
+@lru_cache(maxsize=1)
+def _mock_weather_data(base_hour: datetime) -> list:
+    """Mock forecast for the 8 hours from base_hour; only changes when the hour does"""
+    steps = np.arange(8)
+    times = [f"{t[:10]} {t[11:]}" for t in _mock_hours(base_hour)]
+    temps = 25 + 2 * steps  # Temperature between 25-39°C
+    hums = 60 + 2 * steps
+    winds = 5.0 + steps
+    return [
+        {'time': t, 'temp': temp, 'humidity': hum, 'rain': False, 'wind_speed': wind}
+        for t, temp, hum, wind in zip(times, temps.tolist(), hums.tolist(), winds.tolist())
+    ]
+
+class _ToolInput(BaseModel):
+    """Base for tool argument schemas, on the pydantic v1 models LangChain's BaseTool itself uses"""
+
+class LocationInput(_ToolInput):
     user_id: str = Field(description="User ID to get location for")
 
 class LocationTool(BaseTool):
@@ -17,15 +106,18 @@ class LocationTool(BaseTool):
     args_schema: Type[BaseModel] = LocationInput
     
     def _run(self, user_id: str) -> str:
+        return orjson.dumps(self._run_native(user_id)).decode()
+    
+    def _run_native(self, user_id: str) -> dict:
         try:
-            result = json.dumps({"city": "Mumbai"})
+            result = {"city": "Mumbai"}
             logging.info(f"Location tool result: {result}")
             return result
         except Exception as e:
             logging.error(f"LocationTool error: {e}")
-            return json.dumps({"city": "Mumbai", "error": str(e)})
+            return {"city": "Mumbai", "error": str(e)}
 
-class WeatherInput(BaseModel):
+class WeatherInput(_ToolInput):
     city: str = Field(description="City name to get weather for")
 
 class WeatherTool(BaseTool):
@@ -34,21 +126,30 @@ class WeatherTool(BaseTool):
     args_schema: Type[BaseModel] = WeatherInput
     
     def _run(self, city: str) -> str:
+        return orjson.dumps(self._run_native(city)).decode()
+    
+    def _run_native(self, city: str) -> list:
         try:
             api_key = os.getenv("OPENWEATHER_API_KEY")
             if not api_key:
                 logging.warning("No OpenWeather API key found, using mock data")
                 return self._get_mock_weather_data()
             
-            # Fixed URL with proper HTTPS and correct endpoint
-            url = f"https://api.openweathermap.org/data/2.5/forecast?q={city}&appid={api_key}&units=metric"
+            key = _cache_key(city)
+            cached = _weather_cache.get(key)
+            if cached is not None:
+                logging.info(f"Weather tool result: {len(cached)} entries from cache")
+                return cached
+            
+            # Fixed URL with proper HTTPS and correct endpoint; cnt=8 limits the payload to the slots we use
+            url = f"https://api.openweathermap.org/data/2.5/forecast?q={city}&appid={api_key}&units=metric&cnt=8"
             
             headers = {
                 'User-Agent': 'SportsPlanner/1.0'
             }
             
             logging.info(f"Making weather API request to: {url[:50]}...")
-            response = requests.get(url, headers=headers, timeout=15)
+            response = _http_session.get(url, headers=headers, timeout=15)
             
             logging.info(f"Weather API response status: {response.status_code}")
             
@@ -60,7 +161,7 @@ class WeatherTool(BaseTool):
                 logging.warning(f"Weather API error: {response.status_code} - {response.text}")
                 return self._get_mock_weather_data()
             
-            data = response.json()
+            data = orjson.loads(response.content)
             logging.info(f"Weather API success: Got {len(data.get('list', []))} forecast entries")
             
             weather_data = []
@@ -73,9 +174,9 @@ class WeatherTool(BaseTool):
                     'wind_speed': item['wind']['speed']
                 })
             
-            result = json.dumps(weather_data)
+            _cache_store(_weather_cache, key, weather_data)
             logging.info(f"Weather tool result: {len(weather_data)} entries processed")
-            return result
+            return weather_data
             
         except requests.exceptions.Timeout:
             logging.error("Weather API timeout")
@@ -89,20 +190,10 @@ class WeatherTool(BaseTool):
     
     def _get_mock_weather_data(self):
         """Generate mock weather data for testing"""
-        weather_data = []
-        base_time = datetime.now()
-        for i in range(8):
-            weather_data.append({
-                'time': (base_time + timedelta(hours=i)).strftime("%Y-%m-%d %H:00:00"),
-                'temp': 25 + (i * 2),  # Temperature between 25-39°C
-                'humidity': 60 + (i * 2),
-                'rain': False,
-                'wind_speed': 5.0 + i
-            })
         logging.info("Using mock weather data")
-        return json.dumps(weather_data)
+        return _mock_weather_data(_current_hour())
 
-class AQIInput(BaseModel):
+class AQIInput(_ToolInput):
     city: str = Field(description="City name to get AQI for")
 
 class AQITool(BaseTool):
@@ -111,24 +202,29 @@ class AQITool(BaseTool):
     args_schema: Type[BaseModel] = AQIInput
     
     def _run(self, city: str) -> str:
+        return orjson.dumps(self._run_native(city)).decode()
+    
+    def _run_native(self, city: str) -> list:
         try:
-            aqi_data = []
-            base_time = datetime.now()
-            for i in range(8):
-                aqi_data.append({
-                    'time': (base_time + timedelta(hours=i)).isoformat(),
-                    'aqi': 80 + (i * 5)  # AQI between 80-115
-                })
+            key = _cache_key(city)
+            cached = _aqi_cache.get(key)
+            if cached is not None:
+                logging.info(f"AQI tool result: {len(cached)} entries from cache")
+                return cached
             
-            result = json.dumps(aqi_data)
+            times = _mock_hours(_current_hour())
+            aqis = 80 + 5 * np.arange(8)  # AQI between 80-115
+            aqi_data = [{'time': t, 'aqi': a} for t, a in zip(times, aqis.tolist())]
+            
+            _cache_store(_aqi_cache, key, aqi_data)
             logging.info(f"AQI tool result: {len(aqi_data)} entries")
-            return result
+            return aqi_data
             
         except Exception as e:
             logging.error(f"AQITool error: {e}")
-            return json.dumps([{"time": datetime.now().isoformat(), "aqi": 90}])
+            return [{"time": datetime.now().isoformat(), "aqi": 90}]
 
-class DayTypeInput(BaseModel):
+class DayTypeInput(_ToolInput):
     date: str = Field(description="Date in ISO format to check")
 
 class DayTypeTool(BaseTool):
@@ -137,26 +233,29 @@ class DayTypeTool(BaseTool):
     args_schema: Type[BaseModel] = DayTypeInput
     
     def _run(self, date: str) -> str:
+        return orjson.dumps(self._run_native(date)).decode()
+    
+    def _run_native(self, date: str) -> dict:
         try:
             today = datetime.now()
             if today.weekday() >= 5:  # Saturday = 5, Sunday = 6
-                result = json.dumps({"type": "weekend"})
+                result = {"type": "weekend"}
             else:
-                result = json.dumps({"type": "weekday"})
+                result = {"type": "weekday"}
             
             logging.info(f"Day type tool result: {result}")
             return result
             
         except Exception as e:
             logging.error(f"DayTypeTool error: {e}")
-            return json.dumps({"type": "weekday"})
+            return {"type": "weekday"}
 
-class BestTimeSelectorInput(BaseModel):
+class BestTimeSelectorInput(_ToolInput):
     sport_weather_aqi_data: str = Field(description="JSON string containing sport, weather_data, aqi_data, and day_type")
 
 class BestTimeSelectorTool(BaseTool):
     name = "choose_best_time"
-    description = "Choose best time slots for playing a sport based on weather and AQI. Input should be JSON with sport, weather_data, aqi_data, day_type"
+    description = "Choose best time slots for playing a sport based on weather and AQI. Input should be JSON with sport, weather_data, aqi_data, day_type. Returns the top slots with average temperature and AQI"
     args_schema: Type[BaseModel] = BestTimeSelectorInput
     
     def _run(self, sport_weather_aqi_data: str) -> str:
@@ -164,7 +263,7 @@ class BestTimeSelectorTool(BaseTool):
             logging.info(f"BestTimeSelectorTool input: {sport_weather_aqi_data[:200]}...")
             
             # Parse the input data
-            data = json.loads(sport_weather_aqi_data)
+            data = orjson.loads(sport_weather_aqi_data)
             sport = data.get('sport', 'cricket')
             weather_data_raw = data.get('weather_data', '[]')
             aqi_data_raw = data.get('aqi_data', '[]') 
@@ -172,76 +271,93 @@ class BestTimeSelectorTool(BaseTool):
             
             # Parse nested JSON strings
             if isinstance(weather_data_raw, str):
-                weather = json.loads(weather_data_raw)
+                weather = orjson.loads(weather_data_raw)
             else:
                 weather = weather_data_raw
                 
             if isinstance(aqi_data_raw, str):
-                aqi = json.loads(aqi_data_raw)
+                aqi = orjson.loads(aqi_data_raw)
             else:
                 aqi = aqi_data_raw
+                
+            if isinstance(day_type_raw, str):
+                day_type = orjson.loads(day_type_raw)
+            else:
+                day_type = day_type_raw
             
+            return orjson.dumps(self._run_native(sport, weather, aqi, day_type)).decode()
+            
+        except Exception as e:
+            logging.error(f"BestTimeSelectorTool error: {e}")
+            logging.debug("Traceback:", exc_info=True)
+            # Return empty result on error
+            return orjson.dumps(self._empty_result()).decode()
+    
+    @staticmethod
+    def _empty_result() -> dict:
+        return {'slots': [], 'avg_temp': None, 'avg_aqi': None}
+    
+    def _run_native(self, sport: str, weather: list, aqi: list, day_type: Optional[dict] = None) -> dict:
+        try:
             logging.info(f"Parsed data - Sport: {sport}, Weather entries: {len(weather)}, AQI entries: {len(aqi)}")
             
-            best_slots = []
+            # Skip malformed slots up front so the rest still score; keep each slot's original index
+            rows = []
+            starts = []
             for i, w in enumerate(weather):
                 try:
-                    score = 0
-                    hour = datetime.fromisoformat(w['time'].replace(' ', 'T')).hour
-                    
-                    # Cricket scoring rules
-                    if sport.lower() == "cricket":
-                        # Preferred time slots (early morning and evening)
-                        if 6 <= hour <= 10 or 16 <= hour <= 19:
-                            score += 3
-                        
-                        # Temperature range
-                        if 15 <= w['temp'] <= 30:
-                            score += 2
-                        
-                        # No rain
-                        if not w['rain']:
-                            score += 2
-                        
-                        # Good AQI
-                        if i < len(aqi) and aqi[i]['aqi'] < 100:
-                            score += 2
-                        
-                        # Low humidity
-                        if w['humidity'] < 70:
-                            score += 1
-                    
-                    # Only add slots with decent scores
-                    if score >= 4:
-                        end_time = datetime.fromisoformat(w['time'].replace(' ', 'T')) + timedelta(hours=2)
-                        best_slots.append({
-                            'start': w['time'],
-                            'end': end_time.strftime("%Y-%m-%d %H:%M:%S"),
-                            'score': score,
-                            'temp': w['temp'],
-                            'humidity': w['humidity'],
-                            'aqi': aqi[i]['aqi'] if i < len(aqi) else 'N/A'
-                        })
-                        
+                    hour, start = _parse_fixed_ts(w['time'])
+                    rows.append((i, hour, float(w['temp']), float(w['humidity']),
+                                 bool(w['rain']), float(aqi[i]['aqi']) if i < len(aqi) else np.nan))
+                    starts.append(start)
                 except Exception as slot_error:
                     logging.error(f"Error processing slot {i}: {slot_error}")
-                    continue
             
-            # Sort by score and return top 2
-            best_slots = sorted(best_slots, key=lambda x: x['score'], reverse=True)[:2]
+            n = len(rows)
+            idx = np.fromiter((r[0] for r in rows), dtype=np.int64, count=n)
+            hours = np.fromiter((r[1] for r in rows), dtype=np.int64, count=n)
+            temps = np.fromiter((r[2] for r in rows), dtype=np.float64, count=n)
+            hums = np.fromiter((r[3] for r in rows), dtype=np.float64, count=n)
+            rains = np.fromiter((r[4] for r in rows), dtype=bool, count=n)
+            # Slots without a matching AQI reading are NaN and never earn the AQI points
+            aqis = np.fromiter((r[5] for r in rows), dtype=np.float64, count=n)
+            aqi_values = [a['aqi'] for a in aqi
+                          if isinstance(a, dict) and isinstance(a.get('aqi'), (int, float))]
+            
+            score_fn = SPORT_RULES.get(sport.lower(), _score_default)
+            score = score_fn(hours, temps, hums, rains, aqis)
+            
+            # Keep only slots with decent scores, then take the top 2 (stable, so ties keep forecast order)
+            keep = np.flatnonzero(score >= 4)
+            top = keep[np.argsort(-score[keep], kind='stable')[:2]]
+            
+            # Materialize result dicts only for the selected slots, by their original index
+            best_slots = [
+                {
+                    'start': weather[i]['time'],
+                    'end': (starts[j] + timedelta(hours=2)).strftime("%Y-%m-%d %H:%M:%S"),
+                    'score': int(score[j]),
+                    'temp': weather[i]['temp'],
+                    'humidity': weather[i]['humidity'],
+                    'aqi': aqi[i]['aqi'] if i < len(aqi) else 'N/A'
+                }
+                for j, i in zip(top.tolist(), idx[top].tolist())
+            ]
             
-            result = json.dumps(best_slots)
             logging.info(f"Best time selector result: {len(best_slots)} slots found")
-            return result
+            return {
+                'slots': best_slots,
+                'avg_temp': float(temps.mean()) if n else None,
+                'avg_aqi': float(np.mean(aqi_values)) if aqi_values else None
+            }
             
         except Exception as e:
             logging.error(f"BestTimeSelectorTool error: {e}")
-            import traceback
-            logging.error(f"Traceback: {traceback.format_exc()}")
+            logging.debug("Traceback:", exc_info=True)
             # Return empty result on error
-            return json.dumps([])
+            return self._empty_result()
 
-class MotivationInput(BaseModel):
+class MotivationInput(_ToolInput):
     day_type: str = Field(description="Day type data as JSON string")
 
 class MotivationTool(BaseTool):
@@ -251,15 +367,21 @@ class MotivationTool(BaseTool):
     
     def _run(self, day_type: str) -> str:
         try:
-            day_info = json.loads(day_type)
-            if day_info["type"] == "weekend":
+            return self._run_native(orjson.loads(day_type))
+        except Exception as e:
+            logging.error(f"MotivationTool error: {e}")
+            return "Stay active and healthy! 💪"
+    
+    def _run_native(self, day_type: dict) -> str:
+        try:
+            if day_type["type"] == "weekend":
                 return "It's weekend! Perfect time to get active and play some sports! 🏃‍♂️"
             return "Stay active and healthy! 💪"
         except Exception as e:
             logging.error(f"MotivationTool error: {e}")
             return "Stay active and healthy! 💪"
 
-class TelegramInput(BaseModel):
+class TelegramInput(_ToolInput):
     chat_id: str = Field(description="Telegram chat ID")
     text: str = Field(description="Message text to send")
 
@@ -277,7 +399,7 @@ class TelegramTool(BaseTool):
             
             url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
             data = {"chat_id": chat_id, "text": text}
-            response = requests.post(url, data=data, timeout=10)
+            response = _http_session.post(url, data=data, timeout=10)
             
             if response.status_code == 200:
                 logging.info("Telegram message sent successfully")